@@ -1,39 +1,131 @@
-from flask import Flask, session, request
-from flask_socketio import SocketIO, emit, join_room
+from flask import Flask, session, request, has_request_context
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
+import sys
+import signal
 import secrets
 import random
 import threading
-from datetime import datetime
+import time
 import json
+import heapq
+import bisect
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonWire:
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+def select_wire_json(name):
+    if name == 'orjson' and orjson is not None:
+        return OrjsonWire
+    return json
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = secrets.token_hex(16)
-socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=60, ping_interval=25)
+socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=60, ping_interval=25,
+                    json=select_wire_json(os.environ.get('WIRE_JSON', 'orjson')))
 
 games = {}
+timestamp_cache = {'second': None, 'text': ''}
+pending_events = {}
+events_lock = threading.Lock()
+CPU_BATCH_LIMIT = 64
+PRIVATE_EVENT_FIELDS = ('my_hand', 'role_data')
+lobby = {}
+lobby_entries = {}
+lobby_lock = threading.Lock()
+LOBBY_LIST_LIMIT = 50
+RATE_LIMITS = {
+    'create': (0.2, 3),
+    'join_game': (0.5, 5),
+    'quick_join': (0.5, 5),
+    'spectate_game': (0.5, 5),
+    'list_games': (1.0, 5),
+    'start_game': (0.5, 3),
+    'deal_cards': (0.5, 3),
+    'play_meld': (4.0, 10),
+    'pass_turn': (4.0, 10),
+    'submit_swap': (1.0, 5),
+    'create_tournament': (0.05, 2),
+    'join_tournament': (0.5, 5),
+    'start_tournament': (0.5, 3)
+}
+IP_RATE_MULTIPLIER = 8
+RATE_BUCKET_IDLE = 600
+RATE_PRUNE_INTERVAL = 60
+rate_buckets = {}
+rate_warned = set()
+rate_stats = Counter()
+rate_state = {'last_prune': 0.0}
+rate_lock = threading.Lock()
+OUTBOUND_HIGH_WATER = 64
+tournaments = {}
+tournament_seats = {}
+tournaments_lock = threading.Lock()
+tournaments_by_ip = Counter()
+MAX_TOURNAMENT_TABLES = 500
+PUBLIC_TOURNAMENT_TABLES = 8
+MAX_TOURNAMENTS_PER_IP = 2
+MAX_TOURNAMENT_ROUNDS = 20
+TOURNAMENT_SWAP_DEADLINE = 20
+TOURNAMENT_REJOIN_GRACE = 120
+ROLE_POINTS = {'President': 4, 'Vice President': 3, 'Citizen': 2, 'Vice Asshole': 1, 'Asshole': 0}
+scheduled_jobs = []
+scheduler_cv = threading.Condition()
+scheduler_state = {'thread': None, 'seq': 0}
+SCHEDULER_WORKERS = int(os.environ.get('SCHEDULER_WORKERS', '8'))
+scheduler_pool = ThreadPoolExecutor(max_workers=SCHEDULER_WORKERS, thread_name_prefix='scheduler-job')
+COALESCIBLE_EVENTS = ('meld_played', 'player_passed', 'table_cleared')
+LAGGING_CHECK_INTERVAL = 0.5
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILE_MAX_SECONDS = 60
+PROFILE_SIGNAL_SECONDS = 10
+PROFILE_DEFAULT_INTERVAL = 0.005
+PROFILE_MAX_INTERVAL = 1.0
+profiler_lock = threading.Lock()
+TRACE_BUFFER = 5000
+TRACE_DEFAULT_LIMIT = 500
+trace_spans = deque(maxlen=TRACE_BUFFER)
+tracing = {'enabled': os.environ.get('TRACE_SPANS') == '1'}
 
 RANKS = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2']
 SUITS = ['♠', '♥', '♦', '♣']
+RANK_VALUES = {'3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14, '2': 15}
+MELD_TYPES = {1: 'SINGLE', 2: 'PAIR', 3: 'TRIPLE', 4: 'QUAD'}
+MAX_DECKS = 4
+OPTION_FLAGS = ('wild_2s', 'wild_black3', 'wild_jd')
+MAX_PLAYERS = 16
 
-def create_deck():
+def create_deck(num_decks=1):
     deck = []
-    for rank in RANKS:
-        for suit in SUITS:
-            deck.append({'rank': rank, 'suit': suit})
+    for _ in range(num_decks):
+        for rank in RANKS:
+            for suit in SUITS:
+                deck.append({'rank': rank, 'suit': suit})
     random.shuffle(deck)
     return deck
 
 def deep_copy_cards(cards):
-    return json.loads(json.dumps(cards))
+    return [dict(c) for c in cards]
 
 def card_power(card, options=None):
     if options is None:
         options = {}
     rank_str = card.get('rank', '')
     suit = card.get('suit', '')
-    rank_values = {'3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14, '2': 15}
-    power = rank_values.get(rank_str, 0)
+    power = RANK_VALUES.get(rank_str, 0)
     if options.get('wild_black3') and rank_str == '3' and suit in ('♠', '♣'):
         return 16
     if options.get('wild_jd') and rank_str == 'J' and suit == '♦':
@@ -41,15 +133,17 @@ def card_power(card, options=None):
     return power
 
 def get_meld_type(cards):
-    if len(cards) == 1:
-        return 'SINGLE'
-    if len(cards) == 2 and cards[0]['rank'] == cards[1]['rank']:
-        return 'PAIR'
-    if len(cards) == 3 and cards[0]['rank'] == cards[1]['rank'] == cards[2]['rank']:
-        return 'TRIPLE'
-    if len(cards) == 4 and cards[0]['rank'] == cards[1]['rank'] == cards[2]['rank'] == cards[3]['rank']:
-        return 'QUAD'
-    return None
+    if not cards:
+        return None
+    rank = cards[0]['rank']
+    if any(c['rank'] != rank for c in cards):
+        return None
+    return MELD_TYPES.get(len(cards), f'{len(cards)} OF A KIND')
+
+def hand_contains(hand, cards):
+    available = Counter((c.get('rank'), c.get('suit')) for c in hand)
+    available.subtract((c.get('rank'), c.get('suit')) for c in cards)
+    return all(n >= 0 for n in available.values())
 
 def validate_meld(cards, options=None):
     if options is None:
@@ -130,6 +224,314 @@ def format_card(card):
 def format_cards(cards):
     return ' '.join(format_card(c) for c in cards)
 
+def encode_cards(cards):
+    return [format_card(c) for c in cards]
+
+def event_timestamp():
+    now = int(time.time())
+    if timestamp_cache['second'] != now:
+        timestamp_cache['text'] = time.strftime('%H:%M:%S', time.localtime(now))
+        timestamp_cache['second'] = now
+    return timestamp_cache['text']
+
+def sample_stacks(seconds, interval=PROFILE_DEFAULT_INTERVAL):
+    counts = Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            counts[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+
+def profile_to_file(seconds):
+    if not profiler_lock.acquire(blocking=False):
+        print('[PROFILE] Already running')
+        return
+    try:
+        path = f'/tmp/president-profile-{int(time.time())}.folded'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(sample_stacks(seconds))
+        print(f'[PROFILE] Wrote {path}')
+    finally:
+        profiler_lock.release()
+
+def on_profile_signal(signum, frame):
+    threading.Thread(target=profile_to_file, args=(PROFILE_SIGNAL_SECONDS,), daemon=True).start()
+
+def traced(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            if not tracing['enabled']:
+                return fn(*args)
+            if args and isinstance(args[0], str):
+                game_id = args[0]
+            else:
+                game_id = player_game_id() if has_request_context() else None
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                trace_spans.append({
+                    'name': name,
+                    'game_id': game_id,
+                    'start': started_at,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'thread': threading.current_thread().name
+                })
+        return wrapper
+    return decorator
+
+def player_game_id():
+    return tournament_seats.get(request.sid) or session.get('game_id')
+
+def schedule(delay, fn):
+    with scheduler_cv:
+        scheduler_state['seq'] += 1
+        heapq.heappush(scheduled_jobs, (time.monotonic() + delay, scheduler_state['seq'], fn))
+        if scheduler_state['thread'] is None:
+            scheduler_state['thread'] = threading.Thread(target=run_scheduler, name='scheduler', daemon=True)
+            scheduler_state['thread'].start()
+        scheduler_cv.notify()
+
+def run_scheduler():
+    while True:
+        with scheduler_cv:
+            while not scheduled_jobs or scheduled_jobs[0][0] > time.monotonic():
+                scheduler_cv.wait(scheduled_jobs[0][0] - time.monotonic() if scheduled_jobs else None)
+            _, _, fn = heapq.heappop(scheduled_jobs)
+        scheduler_pool.submit(run_scheduled_job, fn)
+
+def run_scheduled_job(fn):
+    try:
+        fn()
+    except Exception as e:
+        print(f'[SCHEDULER ERROR] {e}')
+        import traceback
+        traceback.print_exc()
+
+def admin_authorized():
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+def queue_room_event(game_id, event, data):
+    with events_lock:
+        pending_events.setdefault(game_id, []).append({'event': event, 'data': data})
+
+@traced('flush_room_events')
+def flush_room_events(game_id):
+    with events_lock:
+        events = pending_events.pop(game_id, [])
+    if not events:
+        return
+    game = games.get(game_id)
+    with app.app_context():
+        if not game:
+            socketio.emit('room_events', {'events': events}, room=game_id)
+            return
+        coalescible = all(e['event'] in COALESCIBLE_EVENTS for e in events)
+        broadcast_events(game, game_id, events, coalescible)
+        if game['spectators']:
+            broadcast_events(game, spectator_room(game_id), public_events(events), coalescible)
+
+def outbound_backlog(eio_sid):
+    sock = socketio.server.eio.sockets.get(eio_sid)
+    return sock.queue.qsize() if sock else 0
+
+def room_participants(room):
+    if '/' not in socketio.server.manager.rooms:
+        return []
+    return socketio.server.manager.get_participants('/', room)
+
+def broadcast_events(game, room, events, coalescible):
+    if coalescible:
+        newly = {sid for sid, eio_sid in room_participants(room) if outbound_backlog(eio_sid) > OUTBOUND_HIGH_WATER}
+        for sid in newly:
+            socketio.server.leave_room(sid, room, namespace='/')
+        with game['lagging_lock']:
+            lagging = game['lagging'].setdefault(room, set())
+            arm = bool(newly) and not lagging
+            lagging |= newly
+            coalesced = len(lagging)
+        if arm:
+            schedule(LAGGING_CHECK_INTERVAL, lambda: check_lagging(game['id'], room))
+        with rate_lock:
+            rate_stats['outbound:coalesced'] += coalesced
+    else:
+        with game['lagging_lock']:
+            lagging = game['lagging'].pop(room, set())
+        readmit_lagging(game, room, lagging)
+    socketio.emit('room_events', {'events': events}, room=room)
+
+def readmit_lagging(game, room, sids):
+    for sid in sids:
+        socketio.server.enter_room(sid, room, namespace='/')
+        socketio.emit('table_snapshot', table_snapshot(game, sid), room=sid)
+    with rate_lock:
+        rate_stats['outbound:resynced'] += len(sids)
+
+def check_lagging(game_id, room):
+    game = games.get(game_id)
+    if not game:
+        return
+    members = game['players'] if room == game_id else game['spectators']
+    with game['lagging_lock']:
+        candidates = list(game['lagging'].get(room, ()))
+    gone = set()
+    drained = set()
+    for sid in candidates:
+        eio_sid = socketio.server.manager.eio_sid_from_sid(sid, '/')
+        if eio_sid is None or sid not in members:
+            gone.add(sid)
+        elif outbound_backlog(eio_sid) <= OUTBOUND_HIGH_WATER:
+            drained.add(sid)
+    with game['lagging_lock']:
+        lagging = game['lagging'].get(room, set())
+        lagging -= gone
+        drained &= lagging
+        lagging -= drained
+        rearm = bool(lagging)
+    with app.app_context():
+        readmit_lagging(game, room, drained)
+    if rearm:
+        schedule(LAGGING_CHECK_INTERVAL, lambda: check_lagging(game_id, room))
+
+def table_snapshot(game, sid):
+    game_over = game['state'] == 'playing' and 0 < len(game['player_order']) <= len(game['elimination_order'])
+    snapshot = {
+        'players_status': get_player_status(game['id']),
+        'game_state': 'game_over' if game_over else game['state'],
+        'table_meld': encode_cards(game['table_meld']),
+        'meld_type': get_meld_type(game['table_meld']) if game['table_meld'] else None
+    }
+    if game_over:
+        snapshot['roles'] = {p['name']: p.get('role', 'Citizen') for p in game['players'].values()}
+    if sid in game['players']:
+        snapshot['hand'] = encode_cards(game['players'][sid]['hand'])
+        if game_over:
+            snapshot['role_data'] = {p['name']: {'role': p.get('role', 'Citizen'), 'hand': encode_cards(p['hand'])} for p in game['players'].values()}
+    return snapshot
+
+def client_ip():
+    return request.headers.get('Fly-Client-IP') or request.remote_addr
+
+def take_token(key, rate, burst, now):
+    bucket = rate_buckets.get(key)
+    if bucket is None:
+        bucket = rate_buckets[key] = [burst, now]
+    tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+    bucket[1] = now
+    if tokens < 1:
+        bucket[0] = tokens
+        return False
+    bucket[0] = tokens - 1
+    return True
+
+def prune_rate_buckets(now):
+    idle = [key for key, bucket in rate_buckets.items() if now - bucket[1] > RATE_BUCKET_IDLE]
+    for key in idle:
+        del rate_buckets[key]
+    rate_state['last_prune'] = now
+
+def allow_event(event, sid, ip):
+    rate, burst = RATE_LIMITS[event]
+    now = time.monotonic()
+    with rate_lock:
+        if now - rate_state['last_prune'] > RATE_PRUNE_INTERVAL:
+            prune_rate_buckets(now)
+        if not take_token(('sid', sid, event), rate, burst, now):
+            rate_stats[f'{event}:rejected_sid'] += 1
+            return False
+        if not take_token(('ip', ip, event), rate * IP_RATE_MULTIPLIER, burst * IP_RATE_MULTIPLIER, now):
+            rate_stats[f'{event}:rejected_ip'] += 1
+            return False
+        rate_stats[f'{event}:allowed'] += 1
+        return True
+
+def rate_limited(event):
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            if not allow_event(event, request.sid, client_ip()):
+                if (request.sid, event) not in rate_warned:
+                    rate_warned.add((request.sid, event))
+                    emit('error', {'message': 'Too many requests - slow down'})
+                return
+            rate_warned.discard((request.sid, event))
+            return handler(*args)
+        return wrapper
+    return decorator
+
+def forget_rate_limits(sid):
+    with rate_lock:
+        for event in RATE_LIMITS:
+            rate_buckets.pop(('sid', sid, event), None)
+            rate_warned.discard((sid, event))
+
+def spectator_room(game_id):
+    return f'{game_id}:spectators'
+
+def stop_spectating():
+    game_id = session.pop('spectating', None)
+    if game_id:
+        leave_room(spectator_room(game_id))
+        if game_id in games:
+            games[game_id]['spectators'].discard(request.sid)
+
+def public_events(events):
+    return [{'event': e['event'], 'data': {k: v for k, v in e['data'].items() if k not in PRIVATE_EVENT_FIELDS}} for e in events]
+
+@app.route('/stats/rate_limits')
+def rate_limit_stats():
+    with rate_lock:
+        return {
+            'counters': dict(rate_stats),
+            'buckets': len(rate_buckets),
+            'limits': RATE_LIMITS,
+            'ip_multiplier': IP_RATE_MULTIPLIER,
+            'outbound_high_water': OUTBOUND_HIGH_WATER
+        }
+
+@app.route('/admin/profile')
+def admin_profile():
+    if not admin_authorized():
+        return 'Forbidden', 403
+    seconds = max(0.1, min(request.args.get('seconds', 5, type=float), PROFILE_MAX_SECONDS))
+    interval = max(0.001, min(request.args.get('interval', PROFILE_DEFAULT_INTERVAL, type=float), PROFILE_MAX_INTERVAL, seconds))
+    if not profiler_lock.acquire(blocking=False):
+        return 'Profiler already running', 409
+    try:
+        folded = sample_stacks(seconds, interval)
+    finally:
+        profiler_lock.release()
+    return folded, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/admin/tracing', methods=['POST'])
+def admin_tracing():
+    if not admin_authorized():
+        return 'Forbidden', 403
+    tracing['enabled'] = request.args.get('enable', '1') == '1'
+    if not tracing['enabled']:
+        trace_spans.clear()
+    return {'enabled': tracing['enabled']}
+
+@app.route('/admin/traces')
+def admin_traces():
+    if not admin_authorized():
+        return 'Forbidden', 403
+    game_id = request.args.get('game_id')
+    limit = max(1, min(request.args.get('limit', TRACE_DEFAULT_LIMIT, type=int), TRACE_BUFFER))
+    spans = [span for span in list(trace_spans) if not game_id or span['game_id'] == game_id]
+    return {'enabled': tracing['enabled'], 'spans': spans[-limit:]}
+
 @app.route('/')
 def index():
     try:
@@ -146,108 +548,323 @@ def on_connect():
     print(f'[CONNECT] {request.sid}')
     emit('connected', {'data': 'connected'})
 
+def clean_options(options):
+    if not isinstance(options, dict):
+        options = {}
+    cleaned = {flag: bool(options.get(flag)) for flag in OPTION_FLAGS}
+    cleaned['decks'] = max(1, min(int(options.get('decks', 1)), MAX_DECKS))
+    return cleaned
+
+def lobby_options_key(options):
+    return ','.join(sorted(k if v is True else f'{k}={v}' for k, v in options.items() if v))
+
+def update_lobby(game_id):
+    with lobby_lock:
+        entry = lobby_entries.pop(game_id, None)
+        if entry:
+            by_count = lobby[entry[0]]
+            by_count[entry[1]].pop(game_id, None)
+            if not by_count[entry[1]]:
+                del by_count[entry[1]]
+            if not by_count:
+                del lobby[entry[0]]
+        game = games.get(game_id)
+        if not game or game.get('tournament_id') or not game['open_seats'] or game['state'] not in ['waiting', 'playing']:
+            return
+        entry = (lobby_options_key(game['options']), len(game['player_order']))
+        lobby.setdefault(entry[0], {}).setdefault(entry[1], {})[game_id] = None
+        lobby_entries[game_id] = entry
+
+def find_open_games(options=None, player_count=None, limit=1):
+    found = []
+    with lobby_lock:
+        if options is None:
+            groups = list(lobby.values())
+        else:
+            groups = [lobby.get(lobby_options_key(clean_options(options)), {})]
+        for by_count in groups:
+            if player_count is None:
+                buckets = list(by_count.values())
+            else:
+                buckets = [by_count.get(player_count, {})]
+            for bucket in buckets:
+                for game_id in bucket:
+                    found.append(game_id)
+                    if len(found) >= limit:
+                        return found
+    return found
+
+def lobby_entry(game_id):
+    game = games[game_id]
+    return {
+        'game_id': game_id,
+        'players': len(game['player_order']),
+        'open_seats': len(game['open_seats']),
+        'options': game['options'],
+        'state': game['state']
+    }
+
+def join_game(game_id, player_name, tournament_seat=False, cpu_to_replace=None):
+    if not game_id or game_id not in games:
+        return 'Game not found'
+    game = games[game_id]
+    if game.get('tournament_id') and not tournament_seat:
+        return 'Tournament tables are joined through the tournament link'
+    seated_id = player_game_id()
+    if seated_id in games and request.sid in games[seated_id]['players']:
+        return 'Already seated at a table'
+    if game['state'] not in ['waiting', 'playing']:
+        return 'Game not available'
+    if cpu_to_replace is None:
+        if not game['open_seats']:
+            return 'No CPU slots available'
+        cpu_to_replace = game['open_seats'][0]
+    if cpu_to_replace in game['open_seats']:
+        game['open_seats'].remove(cpu_to_replace)
+    update_lobby(game_id)
+    cpu_hand = deep_copy_cards(game['players'][cpu_to_replace]['hand'])
+    game['players'][request.sid] = {
+        'name': player_name,
+        'hand': cpu_hand,
+        'is_cpu': False,
+        'player_id': request.sid,
+        'role': game['players'][cpu_to_replace].get('role', 'Citizen')
+    }
+    cpu_position = game['player_order'].index(cpu_to_replace)
+    game['passes'].discard(cpu_to_replace)
+    if cpu_to_replace in game['elimination_order']:
+        game['elimination_order'].remove(cpu_to_replace)
+    game['player_order'][cpu_position] = request.sid
+    del game['players'][cpu_to_replace]
+    stop_spectating()
+    join_room(game_id)
+    session['game_id'] = game_id
+    session['player_id'] = request.sid
+    emit('game_joined', {
+        'game_id': game_id,
+        'player_name': player_name,
+        'hand': encode_cards(cpu_hand),
+        'players_status': get_player_status(game_id),
+        'game_state': game['state'],
+        'table_meld': encode_cards(game['table_meld']),
+        'meld_type': get_meld_type(game['table_meld']) if game['table_meld'] else None
+    })
+    with app.app_context():
+        socketio.emit('player_joined', {
+            'player_name': player_name,
+            'players_status': get_player_status(game_id)
+        }, room=[game_id, spectator_room(game_id)])
+    print(f'[JOIN] {player_name} joined')
+    return None
+
+def leave_game(game_id, player_id):
+    game = games[game_id]
+    player = game['players'][player_id]
+    tournament_id = game.get('tournament_id')
+    if not tournament_id and not any(not p['is_cpu'] for pid, p in game['players'].items() if pid != player_id):
+        del games[game_id]
+        with events_lock:
+            pending_events.pop(game_id, None)
+        update_lobby(game_id)
+        print(f'[LEAVE] {player["name"]} left - game {game_id} closed')
+        return
+    if tournament_id:
+        tournament = tournaments.get(tournament_id)
+        if not tournament:
+            return
+        with tournament['lock']:
+            cpu_id = replace_with_cpu(game, player_id)
+            release_tournament_seat(tournament, player_id, cpu_id)
+    else:
+        cpu_id = replace_with_cpu(game, player_id)
+    position = game['player_order'].index(cpu_id)
+    update_lobby(game_id)
+    with app.app_context():
+        socketio.emit('player_left', {
+            'player_name': player['name'],
+            'players_status': get_player_status(game_id)
+        }, room=[game_id, spectator_room(game_id)])
+    print(f'[LEAVE] {player["name"]} left - seat {position} open')
+    if game['state'] == 'playing' and game['current_player_idx'] == position and player['hand']:
+        threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
+
+def replace_with_cpu(game, player_id):
+    player = game['players'].pop(player_id)
+    position = game['player_order'].index(player_id)
+    cpu_id = f'cpu_{position}_{secrets.token_hex(2)}'
+    game['players'][cpu_id] = {
+        'name': f'CPU-{position}',
+        'hand': player['hand'],
+        'is_cpu': True,
+        'player_id': cpu_id,
+        'role': player.get('role', 'Citizen')
+    }
+    game['player_order'][position] = cpu_id
+    if player_id in game['passes']:
+        game['passes'].discard(player_id)
+        game['passes'].add(cpu_id)
+    if player_id in game['elimination_order']:
+        game['elimination_order'][game['elimination_order'].index(player_id)] = cpu_id
+    if game['last_player_id'] == player_id:
+        game['last_player_id'] = cpu_id
+    if player_id in game['swaps_pending']:
+        game['swaps_pending'][cpu_id] = game['swaps_pending'].pop(player_id)
+    game['open_seats'].append(cpu_id)
+    return cpu_id
+
 @socketio.on('join_game')
+@rate_limited('join_game')
+@traced('join_game')
 def on_join_game(data):
     try:
-        game_id = data.get('game_id')
         player_name = data.get('player_name', '').strip()
         if not player_name:
             emit('error', {'message': 'Please enter a name'})
             return
+        error = join_game(data.get('game_id'), player_name)
+        if error:
+            emit('error', {'message': error})
+    except Exception as e:
+        print(f'[JOIN ERROR] {e}')
+        import traceback
+        traceback.print_exc()
+        emit('error', {'message': str(e)})
+
+@socketio.on('spectate_game')
+@rate_limited('spectate_game')
+def on_spectate_game(data):
+    try:
+        game_id = data.get('game_id')
         if not game_id or game_id not in games:
             emit('error', {'message': 'Game not found'})
             return
         game = games[game_id]
-        if game['state'] not in ['waiting', 'playing']:
-            emit('error', {'message': 'Game not available'})
-            return
-        cpu_to_replace = None
-        for pid, player in game['players'].items():
-            if player['is_cpu']:
-                cpu_to_replace = pid
-                break
-        if not cpu_to_replace:
-            emit('error', {'message': 'No CPU slots available'})
+        seated_id = player_game_id()
+        if seated_id == game_id and request.sid in game['players']:
+            emit('error', {'message': 'You are already playing at this table'})
             return
-        cpu_hand = deep_copy_cards(game['players'][cpu_to_replace]['hand'])
-        game['players'][request.sid] = {
-            'name': player_name,
-            'hand': cpu_hand,
-            'is_cpu': False,
-            'player_id': request.sid,
-            'role': game['players'][cpu_to_replace].get('role', 'Citizen')
-        }
-        cpu_position = game['player_order'].index(cpu_to_replace)
-        game['passes'].discard(cpu_to_replace)
-        if cpu_to_replace in game['elimination_order']:
-            game['elimination_order'].remove(cpu_to_replace)
-        game['player_order'][cpu_position] = request.sid
-        del game['players'][cpu_to_replace]
-        join_room(game_id)
-        session['game_id'] = game_id
-        session['player_id'] = request.sid
-        emit('game_joined', {
+        stop_spectating()
+        if seated_id in games and request.sid in games[seated_id]['players']:
+            leave_game(seated_id, request.sid)
+            leave_room(seated_id)
+        join_room(spectator_room(game_id))
+        game['spectators'].add(request.sid)
+        session['spectating'] = game_id
+        emit('spectating', {
             'game_id': game_id,
-            'player_name': player_name,
-            'hand': cpu_hand,
             'players_status': get_player_status(game_id),
             'game_state': game['state'],
-            'table_meld': game['table_meld'],
-            'meld_type': get_meld_type(game['table_meld']) if game['table_meld'] else None
+            'table_meld': encode_cards(game['table_meld']),
+            'meld_type': get_meld_type(game['table_meld']) if game['table_meld'] else None,
+            'spectator_count': len(game['spectators'])
         })
-        with app.app_context():
-            socketio.emit('player_joined', {
-                'player_name': player_name,
-                'players_status': get_player_status(game_id)
-            }, room=game_id)
-        print(f'[JOIN] {player_name} joined')
+        print(f'[SPECTATE] {request.sid} watching {game_id} ({len(game["spectators"])} spectators)')
     except Exception as e:
-        print(f'[JOIN ERROR] {e}')
-        import traceback
-        traceback.print_exc()
+        print(f'[SPECTATE ERROR] {e}')
+        emit('error', {'message': str(e)})
+
+@socketio.on('list_games')
+@rate_limited('list_games')
+def on_list_games(data=None):
+    data = data or {}
+    limit = min(int(data.get('limit', LOBBY_LIST_LIMIT)), LOBBY_LIST_LIMIT)
+    game_ids = find_open_games(data.get('options'), data.get('players'), limit)
+    emit('games_list', {'games': [lobby_entry(gid) for gid in game_ids if gid in games]})
+
+@socketio.on('quick_join')
+@rate_limited('quick_join')
+@traced('quick_join')
+def on_quick_join(data):
+    try:
+        player_name = data.get('player_name', '').strip()
+        if not player_name:
+            emit('error', {'message': 'Please enter a name'})
+            return
+        game_ids = find_open_games(data.get('options'), data.get('players'))
+        if not game_ids:
+            emit('error', {'message': 'No open tables - create a game instead'})
+            return
+        error = join_game(game_ids[0], player_name)
+        if error:
+            emit('error', {'message': error})
+    except Exception as e:
+        print(f'[QUICK JOIN ERROR] {e}')
         emit('error', {'message': str(e)})
 
+@socketio.on('disconnect')
+def on_disconnect():
+    forget_rate_limits(request.sid)
+    game_id = session.get('spectating')
+    if game_id and game_id in games:
+        games[game_id]['spectators'].discard(request.sid)
+    game_id = player_game_id()
+    if game_id and game_id in games and request.sid in games[game_id]['players']:
+        leave_game(game_id, request.sid)
+
+def new_game(game_id, options):
+    return {
+        'id': game_id,
+        'options': options,
+        'players': {},
+        'deck': [],
+        'state': 'waiting',
+        'player_order': [],
+        'current_player_idx': 0,
+        'table_meld': [],
+        'last_player_id': None,
+        'passes': set(),
+        'play_history': [],
+        'elimination_order': [],
+        'swaps_pending': {},
+        'spectators': set(),
+        'open_seats': [],
+        'next_seat': [],
+        'prev_seat': [],
+        'lagging': {},
+        'lagging_lock': threading.Lock()
+    }
+
+def add_cpu_seat(game, number):
+    cpu_id = f'cpu_{number}_{secrets.token_hex(2)}'
+    game['players'][cpu_id] = {
+        'name': f'CPU-{number+1}',
+        'hand': [],
+        'is_cpu': True,
+        'player_id': cpu_id,
+        'role': 'Citizen'
+    }
+    game['player_order'].append(cpu_id)
+    game['open_seats'].append(cpu_id)
+    return cpu_id
+
 @socketio.on('create')
+@rate_limited('create')
+@traced('create')
 def on_create(data):
     try:
         game_id = secrets.token_hex(4)
-        options = data.get('options', {})
+        options = clean_options(data.get('options'))
         player_name = data.get('name', 'Player')
-        num_cpus = data.get('cpus', 3)
+        num_cpus = max(1, min(int(data.get('cpus', 3)), MAX_PLAYERS - 1))
+        previous_id = player_game_id()
+        if previous_id in games and request.sid in games[previous_id]['players']:
+            leave_game(previous_id, request.sid)
+            leave_room(previous_id)
         print(f'[CREATE] Game {game_id}: {player_name} + {num_cpus} CPUs')
-        games[game_id] = {
-            'id': game_id,
-            'options': options,
-            'players': {
-                request.sid: {
-                    'name': player_name,
-                    'hand': [],
-                    'is_cpu': False,
-                    'player_id': request.sid,
-                    'role': 'Citizen'
-                }
-            },
-            'deck': [],
-            'state': 'waiting',
-            'player_order': [request.sid],
-            'current_player_idx': 0,
-            'table_meld': [],
-            'last_player_id': None,
-            'passes': set(),
-            'play_history': [],
-            'elimination_order': [],
-            'swaps_pending': {}
+        game = new_game(game_id, options)
+        game['players'][request.sid] = {
+            'name': player_name,
+            'hand': [],
+            'is_cpu': False,
+            'player_id': request.sid,
+            'role': 'Citizen'
         }
+        game['player_order'].append(request.sid)
         for i in range(num_cpus):
-            cpu_id = f'cpu_{i}_{secrets.token_hex(2)}'
-            games[game_id]['players'][cpu_id] = {
-                'name': f'CPU-{i+1}',
-                'hand': [],
-                'is_cpu': True,
-                'player_id': cpu_id,
-                'role': 'Citizen'
-            }
-            games[game_id]['player_order'].append(cpu_id)
+            add_cpu_seat(game, i)
+        games[game_id] = game
+        update_lobby(game_id)
+        stop_spectating()
         join_room(game_id)
         session['game_id'] = game_id
         session['player_id'] = request.sid
@@ -257,22 +874,21 @@ def on_create(data):
         emit('error', {'message': str(e)})
 
 @socketio.on('deal_cards')
+@rate_limited('deal_cards')
+@traced('deal_cards')
 def on_deal_cards():
     try:
-        game_id = session.get('game_id')
+        game_id = player_game_id()
         if not game_id or game_id not in games:
             emit('error', {'message': 'No active game'})
             return
         game = games[game_id]
-        deck = create_deck()
-        cards_per_player = 52 // len(game['players'])
-        for idx, player_id in enumerate(game['player_order']):
-            if player_id not in game['players']:
-                continue
-            start = idx * cards_per_player
-            end = start + cards_per_player
-            game['players'][player_id]['hand'] = sort_hand(deck[start:end], game['options'])
+        if game.get('tournament_id'):
+            emit('error', {'message': 'Tournament tables are dealt by the tournament'})
+            return
+        deal_hands(game_id)
         game['state'] = 'playing'
+        update_lobby(game_id)
         game['current_player_idx'] = 0
         game['table_meld'] = []
         game['passes'] = set()
@@ -280,7 +896,7 @@ def on_deal_cards():
         game['elimination_order'] = []
         my_hand = game['players'][request.sid]['hand']
         emit('cards_dealt', {
-            'hand': my_hand,
+            'hand': encode_cards(my_hand),
             'hand_size': len(my_hand),
             'player_count': len(game['players']),
             'players_status': get_player_status(game_id)
@@ -289,7 +905,7 @@ def on_deal_cards():
             'game_id': game_id,
             'state': 'playing',
             'players_status': get_player_status(game_id)
-        }, room=game_id)
+        }, room=[game_id, spectator_room(game_id)])
         print(f'[DEAL] Dealt to {len(game["players"])} players')
         first_player_id = game['player_order'][0]
         if first_player_id in game['players'] and game['players'][first_player_id]['is_cpu']:
@@ -320,22 +936,71 @@ def get_player_status(game_id):
         })
     return status
 
+def deal_hands(game_id):
+    game = games[game_id]
+    deck = create_deck(game['options'].get('decks', 1))
+    seated = [pid for pid in game['player_order'] if pid in game['players']]
+    for offset, player_id in enumerate(seated):
+        game['players'][player_id]['hand'] = sort_hand(deck[offset::len(seated)], game['options'])
+    build_turn_ring(game)
+
+def seat_has_cards(game, seat):
+    return len(game['players'].get(game['player_order'][seat], {}).get('hand', [])) > 0
+
+def build_turn_ring(game):
+    seats = [seat for seat in range(len(game['player_order'])) if seat_has_cards(game, seat)]
+    game['next_seat'] = [None] * len(game['player_order'])
+    game['prev_seat'] = [None] * len(game['player_order'])
+    for i, seat in enumerate(seats):
+        game['next_seat'][seat] = seats[(i + 1) % len(seats)]
+        game['prev_seat'][seat] = seats[i - 1]
+
+def remove_from_ring(game, seat):
+    next_seat = game['next_seat'][seat]
+    prev_seat = game['prev_seat'][seat]
+    if next_seat is None or prev_seat is None:
+        return
+    game['next_seat'][prev_seat] = next_seat
+    game['prev_seat'][next_seat] = prev_seat
+
 def move_to_next_player(game_id):
     if game_id not in games:
         return None
     game = games[game_id]
     if len(game['player_order']) == 0:
         return None
-    game['current_player_idx'] = (game['current_player_idx'] + 1) % len(game['player_order'])
-    current_id = game['player_order'][game['current_player_idx']]
-    start_idx = game['current_player_idx']
-    while len(game['players'].get(current_id, {}).get('hand', [])) == 0:
-        game['current_player_idx'] = (game['current_player_idx'] + 1) % len(game['player_order'])
-        current_id = game['player_order'][game['current_player_idx']]
-        if game['current_player_idx'] == start_idx:
+    seat = game['next_seat'][game['current_player_idx']]
+    hops = 0
+    while seat is not None and not seat_has_cards(game, seat):
+        seat = game['next_seat'][seat]
+        hops += 1
+        if hops > len(game['player_order']):
             return None
-    return current_id
+    if seat is None:
+        return None
+    game['current_player_idx'] = seat
+    return game['player_order'][seat]
 
+def finish_game(game_id):
+    game = games[game_id]
+    game['elimination_order'].extend(pid for pid in game['player_order'] if pid in game['players'] and pid not in game['elimination_order'])
+    deal_hands(game_id)
+    roles = assign_roles(game_id)
+    for pid, role in roles.items():
+        if pid in game['players']:
+            game['players'][pid]['role'] = role
+    role_data = {game['players'][pid]['name']: {'role': roles.get(pid, 'Citizen'), 'hand': encode_cards(game['players'][pid]['hand'])} for pid in game['players']}
+    queue_room_event(game_id, 'game_ended', {
+        'elimination_order': [game['players'][pid]['name'] for pid in game['elimination_order'] if pid in game['players']],
+        'roles': {game['players'][pid]['name']: role for pid, role in roles.items() if pid in game['players']},
+        'role_data': role_data
+    })
+    if game.get('tournament_id'):
+        record_tournament_result(game_id, roles)
+        return
+    threading.Timer(2.0, lambda: cpu_auto_swap(game_id)).start()
+
+@traced('check_round_end')
 def check_round_end(game_id):
     if game_id not in games:
         return False
@@ -351,29 +1016,35 @@ def check_round_end(game_id):
         if len(game['players'][game['last_player_id']]['hand']) > 0:
             game['current_player_idx'] = game['player_order'].index(game['last_player_id'])
         else:
-            idx = game['player_order'].index(game['last_player_id'])
-            game['current_player_idx'] = (idx + 1) % len(game['player_order'])
+            game['current_player_idx'] = game['player_order'].index(game['last_player_id'])
             move_to_next_player(game_id)
-        with app.app_context():
-            socketio.emit('table_cleared', {'players_status': get_player_status(game_id)}, room=game_id)
+        queue_room_event(game_id, 'table_cleared', {'players_status': get_player_status(game_id)})
         return True
     return False
 
 @socketio.on('start_game')
+@rate_limited('start_game')
+@traced('start_game')
 def on_start_game():
     try:
-        game_id = session.get('game_id')
+        game_id = player_game_id()
         if game_id and game_id in games:
             game = games[game_id]
+            if game.get('tournament_id'):
+                emit('error', {'message': 'Tournament tables are started by the organizer'})
+                return
             game['state'] = 'dealing'
+            update_lobby(game_id)
             socketio.emit('ready_to_deal', {'game_id': game_id}, room=game_id)
     except Exception as e:
         print(f'[START ERROR] {e}')
 
 @socketio.on('play_meld')
+@rate_limited('play_meld')
+@traced('play_meld')
 def on_play_meld(data):
     try:
-        game_id = session.get('game_id')
+        game_id = player_game_id()
         if not game_id or game_id not in games:
             emit('error', {'message': 'No active game'})
             return
@@ -386,11 +1057,9 @@ def on_play_meld(data):
         if not player:
             emit('error', {'message': 'Not in game'})
             return
-        for card in cards:
-            found = any(hand_card.get('rank') == card.get('rank') and hand_card.get('suit') == card.get('suit') for hand_card in player['hand'])
-            if not found:
-                emit('error', {'message': 'Card not in hand'})
-                return
+        if not hand_contains(player['hand'], cards):
+            emit('error', {'message': 'Card not in hand'})
+            return
         meld_type = get_meld_type(cards)
         if not meld_type or not validate_meld(cards, game['options']):
             emit('error', {'message': 'Invalid meld'})
@@ -408,41 +1077,25 @@ def on_play_meld(data):
         game['table_meld'] = cards
         game['last_player_id'] = request.sid
         game['passes'].clear()
-        socketio.emit('meld_played', {
+        queue_room_event(game_id, 'meld_played', {
             'player': player['name'],
-            'meld': cards,
+            'meld': encode_cards(cards),
             'meld_type': meld_type,
             'cards_str': format_cards(cards),
-            'timestamp': datetime.now().strftime('%H:%M:%S'),
-            'my_hand': player['hand'],
+            'timestamp': event_timestamp(),
+            'my_hand': encode_cards(player['hand']),
             'players_status': get_player_status(game_id)
-        }, room=game_id)
+        })
         print(f'[PLAY] {player["name"]} played {meld_type}')
         if len(player['hand']) == 0:
             game['elimination_order'].append(request.sid)
+            remove_from_ring(game, game['player_order'].index(request.sid))
             if len(game['elimination_order']) == len(game['player_order']) - 1:
-                deck = create_deck()
-                cards_per_player = 52 // len(game['players'])
-                for idx, player_id in enumerate(game['player_order']):
-                    if player_id not in game['players']:
-                        continue
-                    start = idx * cards_per_player
-                    end = start + cards_per_player
-                    game['players'][player_id]['hand'] = sort_hand(deck[start:end], game['options'])
-                roles = assign_roles(game_id)
-                for pid, role in roles.items():
-                    if pid in game['players']:
-                        game['players'][pid]['role'] = role
-                role_data = {game['players'][pid]['name']: {'role': roles.get(pid, 'Citizen'), 'hand': game['players'][pid]['hand']} for pid in game['players']}
-                with app.app_context():
-                    socketio.emit('game_ended', {
-                        'elimination_order': [game['players'][pid]['name'] for pid in game['elimination_order'] if pid in game['players']],
-                        'roles': {game['players'][pid]['name']: role for pid, role in roles.items() if pid in game['players']},
-                        'role_data': role_data
-                    }, room=game_id)
-                threading.Timer(2.0, lambda: cpu_auto_swap(game_id)).start()
+                finish_game(game_id)
+                flush_room_events(game_id)
                 return
         next_player_id = move_to_next_player(game_id)
+        flush_room_events(game_id)
         if next_player_id and game['players'][next_player_id]['is_cpu']:
             print(f'[PLAY] Scheduling CPU turn')
             threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
@@ -452,20 +1105,30 @@ def on_play_meld(data):
         traceback.print_exc()
         emit('error', {'message': str(e)})
 
+@traced('cpu_play_turn')
 def cpu_play_turn(game_id):
+    turns = 0
+    while cpu_take_turn(game_id):
+        turns += 1
+        if turns >= CPU_BATCH_LIMIT:
+            threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
+            break
+    flush_room_events(game_id)
+
+def cpu_take_turn(game_id):
     if game_id not in games:
-        return
+        return False
     game = games[game_id]
     if game['state'] != 'playing' or len(game['player_order']) == 0:
-        return
+        return False
     if game['current_player_idx'] < 0 or game['current_player_idx'] >= len(game['player_order']):
-        return
+        return False
     current_id = game['player_order'][game['current_player_idx']]
     if current_id not in game['players']:
-        return
+        return False
     player = game['players'][current_id]
     if not player['is_cpu'] or len(player['hand']) == 0:
-        return
+        return False
     print(f'[CPU] {player["name"]} ({len(player["hand"])} cards)')
     meld = cpu_play_meld(player['hand'], game['table_meld'], game['options'])
     if meld:
@@ -477,61 +1140,42 @@ def cpu_play_turn(game_id):
         game['table_meld'] = meld
         game['last_player_id'] = current_id
         game['passes'].clear()
-        with app.app_context():
-            socketio.emit('meld_played', {
-                'player': player['name'],
-                'meld': meld,
-                'meld_type': get_meld_type(meld),
-                'cards_str': format_cards(meld),
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'players_status': get_player_status(game_id)
-            }, room=game_id)
+        queue_room_event(game_id, 'meld_played', {
+            'player': player['name'],
+            'meld': encode_cards(meld),
+            'meld_type': get_meld_type(meld),
+            'cards_str': format_cards(meld),
+            'timestamp': event_timestamp(),
+            'players_status': get_player_status(game_id)
+        })
         print(f'[CPU] Played: {format_cards(meld)}')
         if len(player['hand']) == 0:
             game['elimination_order'].append(current_id)
+            remove_from_ring(game, game['current_player_idx'])
             if len(game['elimination_order']) == len(game['player_order']) - 1:
-                deck = create_deck()
-                cards_per_player = 52 // len(game['players'])
-                for idx, player_id in enumerate(game['player_order']):
-                    if player_id not in game['players']:
-                        continue
-                    start = idx * cards_per_player
-                    end = start + cards_per_player
-                    game['players'][player_id]['hand'] = sort_hand(deck[start:end], game['options'])
-                roles = assign_roles(game_id)
-                for pid, role in roles.items():
-                    if pid in game['players']:
-                        game['players'][pid]['role'] = role
-                role_data = {game['players'][pid]['name']: {'role': roles.get(pid, 'Citizen'), 'hand': game['players'][pid]['hand']} for pid in game['players']}
-                with app.app_context():
-                    socketio.emit('game_ended', {
-                        'elimination_order': [game['players'][pid]['name'] for pid in game['elimination_order'] if pid in game['players']],
-                        'roles': {game['players'][pid]['name']: role for pid, role in roles.items() if pid in game['players']},
-                        'role_data': role_data
-                    }, room=game_id)
-                threading.Timer(2.0, lambda: cpu_auto_swap(game_id)).start()
-                return
+                finish_game(game_id)
+                return False
         next_player_id = move_to_next_player(game_id)
-        if next_player_id and game['players'][next_player_id]['is_cpu']:
-            threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
-    else:
-        game['passes'].add(current_id)
-        with app.app_context():
-            socketio.emit('player_passed', {
-                'player': player['name'],
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'players_status': get_player_status(game_id)
-            }, room=game_id)
-        print(f'[CPU] Passed')
-        if not check_round_end(game_id):
-            next_player_id = move_to_next_player(game_id)
-            if next_player_id and game['players'][next_player_id]['is_cpu']:
-                threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
+        return bool(next_player_id and game['players'][next_player_id]['is_cpu'])
+    game['passes'].add(current_id)
+    queue_room_event(game_id, 'player_passed', {
+        'player': player['name'],
+        'timestamp': event_timestamp(),
+        'players_status': get_player_status(game_id)
+    })
+    print(f'[CPU] Passed')
+    if check_round_end(game_id):
+        current_id = game['player_order'][game['current_player_idx']]
+        return current_id in game['players'] and game['players'][current_id]['is_cpu']
+    next_player_id = move_to_next_player(game_id)
+    return bool(next_player_id and game['players'][next_player_id]['is_cpu'])
 
 @socketio.on('pass_turn')
+@rate_limited('pass_turn')
+@traced('pass_turn')
 def on_pass_turn():
     try:
-        game_id = session.get('game_id')
+        game_id = player_game_id()
         if not game_id or game_id not in games:
             emit('error', {'message': 'No active game'})
             return
@@ -541,20 +1185,24 @@ def on_pass_turn():
             emit('error', {'message': 'Cannot pass'})
             return
         game['passes'].add(request.sid)
-        socketio.emit('player_passed', {
+        queue_room_event(game_id, 'player_passed', {
             'player': player['name'],
-            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'timestamp': event_timestamp(),
             'players_status': get_player_status(game_id)
-        }, room=game_id)
+        })
         print(f'[PASS] {player["name"]}')
-        if not check_round_end(game_id):
+        if check_round_end(game_id):
+            next_player_id = game['player_order'][game['current_player_idx']]
+        else:
             next_player_id = move_to_next_player(game_id)
-            if next_player_id and game['players'][next_player_id]['is_cpu']:
-                threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
+        flush_room_events(game_id)
+        if next_player_id and next_player_id in game['players'] and game['players'][next_player_id]['is_cpu']:
+            threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
     except Exception as e:
         print(f'[PASS ERROR] {e}')
         emit('error', {'message': str(e)})
 
+@traced('cpu_auto_swap')
 def cpu_auto_swap(game_id):
     if game_id not in games:
         return
@@ -581,9 +1229,11 @@ def cpu_auto_swap(game_id):
         execute_swaps(game_id)
 
 @socketio.on('submit_swap')
+@rate_limited('submit_swap')
+@traced('submit_swap')
 def on_submit_swap(data):
     try:
-        game_id = session.get('game_id')
+        game_id = player_game_id()
         if not game_id or game_id not in games:
             return
         game = games[game_id]
@@ -594,6 +1244,7 @@ def on_submit_swap(data):
     except Exception as e:
         print(f'[SWAP ERROR] {e}')
 
+@traced('execute_swaps')
 def execute_swaps(game_id):
     if game_id not in games:
         return
@@ -631,21 +1282,19 @@ def execute_swaps(game_id):
     game['swaps_pending'] = {}
     with app.app_context():
         socketio.emit('swaps_complete', {}, room=game_id)
+    if game.get('tournament_id'):
+        tournament_table_swapped(game_id)
+        return
     threading.Timer(2.0, lambda: start_new_round(game_id)).start()
 
+@traced('start_new_round')
 def start_new_round(game_id):
     if game_id not in games:
         return
     game = games[game_id]
-    deck = create_deck()
-    cards_per_player = 52 // len(game['players'])
-    for idx, player_id in enumerate(game['player_order']):
-        if player_id not in game['players']:
-            continue
-        start = idx * cards_per_player
-        end = start + cards_per_player
-        game['players'][player_id]['hand'] = sort_hand(deck[start:end], game['options'])
-        game['players'][player_id]['role'] = 'Citizen'
+    deal_hands(game_id)
+    for player in game['players'].values():
+        player['role'] = 'Citizen'
     game['state'] = 'playing'
     game['current_player_idx'] = 0
     game['table_meld'] = []
@@ -653,8 +1302,363 @@ def start_new_round(game_id):
     game['last_player_id'] = None
     game['elimination_order'] = []
     with app.app_context():
-        socketio.emit('new_round_started', {'players_status': get_player_status(game_id)}, room=game_id)
+        socketio.emit('new_round_started', {'players_status': get_player_status(game_id)}, room=[game_id, spectator_room(game_id)])
+        for player_id, player in game['players'].items():
+            if not player['is_cpu']:
+                socketio.emit('cards_dealt', {
+                    'hand': encode_cards(player['hand']),
+                    'hand_size': len(player['hand']),
+                    'player_count': len(game['players']),
+                    'players_status': get_player_status(game_id)
+                }, room=player_id)
+    if game['players'][game['player_order'][0]]['is_cpu']:
+        if game.get('tournament_id'):
+            schedule(2.5, lambda: cpu_play_turn(game_id))
+        else:
+            threading.Timer(2.5, lambda: cpu_play_turn(game_id)).start()
+
+def create_tournament(options, num_tables, table_size, rounds, creator_ip):
+    tournament_id = secrets.token_hex(4)
+    tournament = {
+        'id': tournament_id,
+        'options': options,
+        'table_size': table_size,
+        'rounds': rounds,
+        'round': 0,
+        'creator_ip': creator_ip,
+        'state': 'waiting',
+        'tables': [],
+        'entrants': {},
+        'entrant_of': {},
+        'standings': [],
+        'humans': set(),
+        'rejoin_tokens': {},
+        'finished_tables': set(),
+        'swapped_tables': set(),
+        'lock': threading.RLock()
+    }
+    number = 0
+    for table_number in range(num_tables):
+        game_id = secrets.token_hex(4)
+        game = new_game(game_id, dict(options))
+        game['tournament_id'] = tournament_id
+        game['table_number'] = table_number + 1
+        for _ in range(table_size):
+            cpu_id = add_cpu_seat(game, number)
+            entrant_id = f'e{number}'
+            cpu_name = game['players'][cpu_id]['name']
+            tournament['entrants'][entrant_id] = {'name': cpu_name, 'cpu_name': cpu_name, 'player_id': cpu_id, 'score': 0}
+            tournament['entrant_of'][cpu_id] = entrant_id
+            tournament['standings'].append((0, entrant_id))
+            number += 1
+        games[game_id] = game
+        tournament['tables'].append(game_id)
+    tournament['standings'].sort()
+    with tournaments_lock:
+        tournaments[tournament_id] = tournament
+    return tournament
+
+def rebind_entrant(tournament, old_id, new_id, name):
+    entrant_id = tournament['entrant_of'].pop(old_id)
+    tournament['entrant_of'][new_id] = entrant_id
+    tournament['entrants'][entrant_id]['player_id'] = new_id
+    tournament['entrants'][entrant_id]['name'] = name
+    return tournament['entrants'][entrant_id]
+
+def update_standing(tournament, entrant_id, points):
+    entrant = tournament['entrants'][entrant_id]
+    standings = tournament['standings']
+    del standings[bisect.bisect_left(standings, (-entrant['score'], entrant_id))]
+    entrant['score'] += points
+    bisect.insort(standings, (-entrant['score'], entrant_id))
+
+def standings_view(tournament, limit=None):
+    rows = tournament['standings'] if limit is None else tournament['standings'][:limit]
+    return [{'rank': i + 1, 'name': tournament['entrants'][entrant_id]['name'], 'score': -neg_score} for i, (neg_score, entrant_id) in enumerate(rows)]
+
+def tournament_rooms(tournament):
+    return tournament['tables'] + [spectator_room(game_id) for game_id in tournament['tables']]
+
+def seat_in_tournament(tournament, player_name, rejoin_token=None):
+    if request.sid in tournament_seats:
+        return 'Already seated in a tournament'
+    entrant_id = tournament['rejoin_tokens'].get(rejoin_token)
+    if entrant_id:
+        cpu_id = tournament['entrants'][entrant_id]['player_id']
+        if cpu_id in tournament['humans']:
+            return 'That seat is already in use'
+        game_id = next(game_id for game_id in tournament['tables'] if cpu_id in games[game_id]['players'])
+        return take_tournament_seat(tournament, game_id, cpu_id, player_name)
+    if tournament['state'] != 'waiting':
+        return 'Tournament already started'
+    for game_id in tournament['tables']:
+        game = games[game_id]
+        if game['open_seats']:
+            return take_tournament_seat(tournament, game_id, game['open_seats'][0], player_name)
+    return 'Tournament is full'
+
+def take_tournament_seat(tournament, game_id, cpu_id, player_name):
+    error = join_game(game_id, player_name, tournament_seat=True, cpu_to_replace=cpu_id)
+    if error:
+        return error
+    entrant = rebind_entrant(tournament, cpu_id, request.sid, player_name)
+    if 'rejoin_token' not in entrant:
+        entrant['rejoin_token'] = secrets.token_urlsafe(12)
+        tournament['rejoin_tokens'][entrant['rejoin_token']] = tournament['entrant_of'][request.sid]
+    tournament['humans'].add(request.sid)
+    if not tournament.get('organizer'):
+        tournament['organizer'] = request.sid
+    tournament_seats[request.sid] = game_id
+    emit('tournament_joined', {
+        'tournament_id': tournament['id'],
+        'table': games[game_id]['table_number'],
+        'tables': len(tournament['tables']),
+        'round': tournament['round'],
+        'rounds': tournament['rounds'],
+        'state': tournament['state'],
+        'rejoin_token': entrant['rejoin_token']
+    })
+    return None
+
+def release_tournament_seat(tournament, player_id, cpu_id):
+    game = games[tournament_seats.pop(player_id)]
+    tournament['humans'].discard(player_id)
+    if tournament.get('organizer') == player_id:
+        tournament['organizer'] = next(iter(tournament['humans']), None)
+    entrant = tournament['entrants'][tournament['entrant_of'][player_id]]
+    rebind_entrant(tournament, player_id, cpu_id, entrant['name'])
+    game['open_seats'].remove(cpu_id)
+    game['players'][cpu_id]['name'] = entrant['cpu_name']
+    if not tournament['humans']:
+        schedule(TOURNAMENT_REJOIN_GRACE, lambda: close_abandoned_tournament(tournament['id']))
+
+def close_abandoned_tournament(tournament_id):
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['humans'] or tournament['state'] == 'closed':
+            return
+        for game_id in tournament['tables']:
+            games.pop(game_id, None)
+            with events_lock:
+                pending_events.pop(game_id, None)
+        tournament['state'] = 'closed'
+        with tournaments_lock:
+            del tournaments[tournament_id]
+            tournaments_by_ip[tournament['creator_ip']] -= 1
+            if not tournaments_by_ip[tournament['creator_ip']]:
+                del tournaments_by_ip[tournament['creator_ip']]
+    print(f'[TOURNAMENT] {tournament_id} closed - no players left')
+
+def start_tournament_round(tournament_id):
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['state'] == 'closed':
+            return
+        tournament['finished_tables'] = set()
+        tournament['swapped_tables'] = set()
+        tables = list(tournament['tables'])
+        print(f'[TOURNAMENT] {tournament_id} round {tournament["round"]}/{tournament["rounds"]} on {len(tables)} tables')
+    for game_id in tables:
+        start_new_round(game_id)
+
+def record_tournament_result(game_id, roles):
+    tournament_id = games[game_id]['tournament_id']
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['state'] == 'closed' or game_id in tournament['finished_tables']:
+            return
+        for player_id, role in roles.items():
+            if player_id in tournament['entrant_of']:
+                update_standing(tournament, tournament['entrant_of'][player_id], ROLE_POINTS.get(role, 0))
+        tournament['finished_tables'].add(game_id)
+        round_over = len(tournament['finished_tables']) == len(tournament['tables'])
+    if round_over:
+        schedule(2.0, lambda: run_tournament_swaps(tournament_id))
+
+@traced('run_tournament_swaps')
+def run_tournament_swaps(tournament_id):
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['state'] == 'closed':
+            return
+        round_number = tournament['round']
+        tables = list(tournament['tables'])
+        standings = standings_view(tournament, 10)
+        rooms = tournament_rooms(tournament)
+    with app.app_context():
+        socketio.emit('tournament_standings', {'round': round_number, 'rounds': tournament['rounds'], 'standings': standings}, room=rooms)
+    for game_id in tables:
+        cpu_auto_swap(game_id)
+    schedule(TOURNAMENT_SWAP_DEADLINE, lambda: force_tournament_swaps(tournament_id, round_number))
+
+def force_tournament_swaps(tournament_id, round_number):
+    tournament = tournaments.get(tournament_id)
+    if not tournament or tournament['round'] != round_number:
+        return
+    for game_id in list(tournament['tables']):
+        if game_id not in tournament['swapped_tables']:
+            execute_swaps(game_id)
+
+def tournament_table_swapped(game_id):
+    tournament_id = games[game_id]['tournament_id']
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['state'] == 'closed' or game_id in tournament['swapped_tables']:
+            return
+        tournament['swapped_tables'].add(game_id)
+        all_swapped = len(tournament['swapped_tables']) == len(tournament['tables'])
+    if all_swapped:
+        schedule(2.0, lambda: next_tournament_round(tournament_id))
+
+def reseat_tournament(tournament):
+    ranking = [entrant_id for _, entrant_id in tournament['standings']]
+    pool = {}
+    previous_table = {}
+    for game_id in tournament['tables']:
+        game = games[game_id]
+        for player_id in game['player_order']:
+            pool[player_id] = game['players'][player_id]
+            previous_table[player_id] = game_id
+    size = tournament['table_size']
+    moves = []
+    for index, game_id in enumerate(tournament['tables']):
+        game = games[game_id]
+        seated = [tournament['entrants'][entrant_id]['player_id'] for entrant_id in ranking[index * size:(index + 1) * size]]
+        game['players'] = {player_id: pool[player_id] for player_id in seated}
+        game['player_order'] = seated
+        game['open_seats'] = [player_id for player_id in seated if pool[player_id]['is_cpu'] and 'rejoin_token' not in tournament['entrants'][tournament['entrant_of'][player_id]]]
+        game['swaps_pending'] = {}
+        for rank, player_id in enumerate(seated, start=index * size + 1):
+            if not pool[player_id]['is_cpu'] and previous_table[player_id] != game_id:
+                moves.append((player_id, previous_table[player_id], game_id, rank))
+    return moves
+
+@traced('next_tournament_round')
+def next_tournament_round(tournament_id):
+    tournament = tournaments.get(tournament_id)
+    if not tournament:
+        return
+    with tournament['lock']:
+        if tournament['state'] == 'closed':
+            return
+        if tournament['round'] >= tournament['rounds']:
+            tournament['state'] = 'finished'
+            standings = standings_view(tournament)
+            rooms = tournament_rooms(tournament)
+            moves = None
+        else:
+            moves = reseat_tournament(tournament)
+            tournament['round'] += 1
+            round_number = tournament['round']
+            for player_id, old_game_id, new_game_id, rank in moves:
+                socketio.server.leave_room(player_id, old_game_id, namespace='/')
+                socketio.server.enter_room(player_id, new_game_id, namespace='/')
+                tournament_seats[player_id] = new_game_id
+    with app.app_context():
+        if moves is None:
+            socketio.emit('tournament_finished', {'standings': standings}, room=rooms)
+            print(f'[TOURNAMENT] {tournament_id} finished')
+            return
+        for player_id, old_game_id, new_game_id, rank in moves:
+            socketio.emit('tournament_reseated', {
+                'game_id': new_game_id,
+                'table': games[new_game_id]['table_number'],
+                'rank': rank,
+                'round': round_number
+            }, room=player_id)
+    print(f'[TOURNAMENT] {tournament_id} reseated {len(moves)} players')
+    start_tournament_round(tournament_id)
+
+@socketio.on('create_tournament')
+@rate_limited('create_tournament')
+def on_create_tournament(data):
+    try:
+        player_name = data.get('name', '').strip()
+        if not player_name:
+            emit('error', {'message': 'Please enter a name'})
+            return
+        admin = admin_authorized()
+        options = clean_options(data.get('options'))
+        num_tables = max(2, min(int(data.get('tables', 4)), MAX_TOURNAMENT_TABLES if admin else PUBLIC_TOURNAMENT_TABLES))
+        table_size = max(3, min(int(data.get('table_size', 4)), MAX_PLAYERS))
+        rounds = max(1, min(int(data.get('rounds', 3)), MAX_TOURNAMENT_ROUNDS))
+        ip = client_ip()
+        with tournaments_lock:
+            if not admin and tournaments_by_ip[ip] >= MAX_TOURNAMENTS_PER_IP:
+                emit('error', {'message': 'Too many tournaments running from your address'})
+                return
+            tournaments_by_ip[ip] += 1
+        previous_id = player_game_id()
+        if previous_id in games and request.sid in games[previous_id]['players']:
+            leave_game(previous_id, request.sid)
+            leave_room(previous_id)
+        tournament = create_tournament(options, num_tables, table_size, rounds, ip)
+        with tournament['lock']:
+            tournament['organizer'] = request.sid
+            error = seat_in_tournament(tournament, player_name)
+        if error:
+            close_abandoned_tournament(tournament['id'])
+            emit('error', {'message': error})
+            return
+        print(f'[TOURNAMENT] {tournament["id"]}: {num_tables} tables x {table_size}, {rounds} rounds')
+        emit('tournament_created', {'tournament_id': tournament['id'], 'tables': num_tables, 'rounds': rounds})
+    except Exception as e:
+        print(f'[TOURNAMENT ERROR] {e}')
+        emit('error', {'message': str(e)})
+
+@socketio.on('join_tournament')
+@rate_limited('join_tournament')
+def on_join_tournament(data):
+    try:
+        player_name = data.get('player_name', '').strip()
+        if not player_name:
+            emit('error', {'message': 'Please enter a name'})
+            return
+        tournament = tournaments.get(data.get('tournament_id'))
+        if not tournament:
+            emit('error', {'message': 'Tournament not found'})
+            return
+        with tournament['lock']:
+            if tournament['state'] in ('finished', 'closed'):
+                emit('error', {'message': 'Tournament not found'})
+                return
+            error = seat_in_tournament(tournament, player_name, data.get('rejoin_token'))
+        if error:
+            emit('error', {'message': error})
+    except Exception as e:
+        print(f'[TOURNAMENT JOIN ERROR] {e}')
+        emit('error', {'message': str(e)})
+
+@socketio.on('start_tournament')
+@rate_limited('start_tournament')
+def on_start_tournament(data):
+    tournament = tournaments.get(data.get('tournament_id'))
+    if not tournament:
+        emit('error', {'message': 'Only the organizer can start the tournament'})
+        return
+    with tournament['lock']:
+        if tournament.get('organizer') != request.sid:
+            emit('error', {'message': 'Only the organizer can start the tournament'})
+            return
+        if tournament['state'] != 'waiting':
+            emit('error', {'message': 'Tournament already started'})
+            return
+        tournament['state'] = 'running'
+        tournament['round'] = 1
+    schedule(0, lambda: start_tournament_round(tournament['id']))
 
 if __name__ == '__main__':
     print('[STARTUP] President Game on 0.0.0.0:8080')
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, on_profile_signal)
     socketio.run(app, debug=False, host='0.0.0.0', port=8080, allow_unsafe_werkzeug=True)
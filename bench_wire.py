@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Wire serializer benchmark
+Emits room_events envelopes with the fields cpu_take_turn and finish_game
+queue to N rooms of fake participants and reports bytes per event and
+time per emit for each serializer/card encoding.
+Just run: python bench_wire.py [rooms ...]
+"""
+
+import sys
+import time
+import json
+import random
+import socketio
+from app import OrjsonWire, orjson, create_deck, sort_hand, get_meld_type, format_cards, event_timestamp, deep_copy_cards, encode_cards
+
+SEATS_PER_ROOM = 4
+EMITS_PER_ROOM = 5
+
+def sample_events(card_encoder):
+    random.seed(1)
+    deck = sort_hand(create_deck(1))
+    status = [{'name': f'CPU-{i}', 'card_count': 13, 'is_active': i == 0, 'is_cpu': True} for i in range(SEATS_PER_ROOM)]
+    events = []
+    for i in range(6):
+        meld = deck[i * 2:i * 2 + 2]
+        events.append({'event': 'meld_played', 'data': {
+            'player': f'CPU-{i % SEATS_PER_ROOM}',
+            'meld': card_encoder(meld),
+            'meld_type': get_meld_type(meld),
+            'cards_str': format_cards(meld),
+            'timestamp': event_timestamp(),
+            'players_status': status
+        }})
+        events.append({'event': 'player_passed', 'data': {
+            'player': f'CPU-{(i + 1) % SEATS_PER_ROOM}',
+            'timestamp': event_timestamp(),
+            'players_status': status
+        }})
+    events.append({'event': 'table_cleared', 'data': {'players_status': status}})
+    roles = dict(zip((s['name'] for s in status), ('President', 'Vice President', 'Vice Asshole', 'Asshole')))
+    events.append({'event': 'game_ended', 'data': {
+        'elimination_order': list(roles),
+        'roles': roles,
+        'role_data': {s['name']: {'role': roles[s['name']], 'hand': card_encoder(deck[i * 13:(i + 1) * 13])} for i, s in enumerate(status)}
+    }})
+    return {'events': events}
+
+def run(json_module, card_encoder, num_rooms):
+    server = socketio.Server(async_mode='threading', json=json_module)
+    sent = {'packets': 0, 'bytes': 0}
+
+    def count_packet(eio_sid, eio_pkt):
+        sent['packets'] += 1
+        sent['bytes'] += len(eio_pkt.data)
+
+    server._send_eio_packet = count_packet
+    server.manager.initialize()
+    rooms = []
+    for r in range(num_rooms):
+        room = f'table-{r}'
+        for s in range(SEATS_PER_ROOM):
+            sid = server.manager.connect(f'eio-{r}-{s}', '/')
+            server.manager.enter_room(sid, '/', room)
+        rooms.append(room)
+    payload = sample_events(card_encoder)
+    start = time.perf_counter()
+    for _ in range(EMITS_PER_ROOM):
+        for room in rooms:
+            server.emit('room_events', payload, room=room)
+    elapsed = time.perf_counter() - start
+    emits = EMITS_PER_ROOM * num_rooms
+    return sent['bytes'] / sent['packets'] / len(payload['events']), elapsed / emits * 1e6
+
+def main():
+    room_counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    variants = [('stdlib json + dict cards', json, deep_copy_cards)]
+    if orjson is not None:
+        variants.append(('orjson + compact cards', OrjsonWire, encode_cards))
+    else:
+        print('orjson not installed - benchmarking stdlib json only')
+    print(f'{"rooms":>6}  {"serializer":<26} {"bytes/event":>11} {"us/emit":>9}')
+    for num_rooms in room_counts:
+        for label, json_module, card_encoder in variants:
+            size, micros = run(json_module, card_encoder, num_rooms)
+            print(f'{num_rooms:>6}  {label:<26} {size:>11.0f} {micros:>9.1f}')
+
+if __name__ == '__main__':
+    main()